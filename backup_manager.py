@@ -1,9 +1,11 @@
 import os
+import shlex
 import zipfile
-import json
 from datetime import datetime
 import shutil
 
+from database_manager import encode_json
+
 
 class BackupManager:
     def __init__(self, backups_dir, rclone_include_files_dir):
@@ -13,9 +15,6 @@ class BackupManager:
 
     def create_backup(self, args, rclone_commands, db_before, db_after):
         """Creates a backup of inputs, commands, include files, and databases."""
-        if not os.path.exists(self.backups_dir):
-            os.makedirs(self.backups_dir)
-
         backup_dir = os.path.join(
             self.backups_dir, datetime.now().strftime("%Y%m%d_%H%M%S")
         )
@@ -26,25 +25,30 @@ class BackupManager:
 
         with open(os.path.join(backup_dir, "generated_commands.txt"), "w") as f:
             for cmd in rclone_commands:
-                f.write(f"{cmd}\n")
+                f.write(f"{shlex.join(cmd)}\n")
 
         include_files_path = os.path.join(backup_dir, "include_files.zip")
-        with zipfile.ZipFile(include_files_path, "w") as zipf:
-            for root, _, files in os.walk(self.rclone_include_files_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    zipf.write(
-                        file_path,
-                        os.path.relpath(file_path, self.rclone_include_files_dir),
-                    )
-
-        with open(os.path.join(backup_dir, "database_before.json"), "w") as f:
-            json.dump(db_before, f, indent=4)
-        with open(os.path.join(backup_dir, "database_after.json"), "w") as f:
-            json.dump(db_after, f, indent=4)
+        with zipfile.ZipFile(
+            include_files_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1
+        ) as zipf:
+            for file_path, arcname in self._iter_include_files():
+                zipf.write(file_path, arcname)
+
+        with open(os.path.join(backup_dir, "database_before.json"), "wb") as f:
+            f.write(encode_json(db_before))
+        with open(os.path.join(backup_dir, "database_after.json"), "wb") as f:
+            f.write(encode_json(db_after))
 
         print(f"Backup created in: {backup_dir}")
 
+    def _iter_include_files(self):
+        """Yields (path, arcname) for every include file."""
+        # Include files are written flat into the directory, one per account.
+        with os.scandir(self.rclone_include_files_dir) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.name
+
     def clear_include_files_directory(self):
         """Clears all contents inside the include files directory."""
         if os.path.exists(self.rclone_include_files_dir):
@@ -1,95 +1,339 @@
+import functools
+import heapq
 import json
 import os
 import shutil
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+INITIAL_QUOTA = int(14.95 * 1024**3)  # Not doing 15 fully for now
+
+
+def encode_json(obj, pretty=True):
+    """Serializes obj to JSON bytes, using orjson when available."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, indent=4).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(data):
+    """Parses JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def clone_json(obj):
+    """Deep-copies a JSON-compatible object by round-tripping it through JSON.
+
+    Much faster than copy.deepcopy for plain dict/list/str/int trees like the
+    database.
+    """
+    return decode_json(encode_json(obj, pretty=False))
+
+
+@functools.lru_cache(maxsize=1)
+def get_service_account_ids(accounts_folder):
+    """Returns the ids of the service account key files in accounts_folder.
+
+    The result is cached per folder; a tuple so callers can't mutate it.
+    """
+    with os.scandir(accounts_folder) as entries:
+        return tuple(
+            entry.name[: -len(".json")]
+            for entry in entries
+            if entry.name.endswith(".json") and entry.is_file()
+        )
+
+
+def _link_or_copy(src, dst):
+    """Hardlinks src to dst, falling back to a copy across filesystems.
+
+    A link is safe for database backups because the snapshot is only ever
+    replaced, never rewritten in place, and the log is deleted once a new
+    snapshot includes it; the backup keeps the old file either way.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _apply_op(db, op):
+    """Applies one mutation record from the database log to db.
+
+    Records are idempotent, so replaying a log over a snapshot that already
+    contains some of its changes gives the same result.
+    """
+    accounts = db["accounts"]
+    if op["op"] == "account":
+        accounts.setdefault(
+            op["account_id"],
+            {"used_space": 0, "remaining_space": op["remaining_space"], "files": {}},
+        )
+        return
+
+    account = accounts[op["account_id"]]
+    previous = account["files"].pop(op["path"], None)
+    if previous is not None:
+        account["used_space"] -= previous["size"]
+        account["remaining_space"] += previous["size"]
+    if op["op"] == "add":
+        account["used_space"] += op["size"]
+        account["remaining_space"] -= op["size"]
+        account["files"][op["path"]] = {"size": op["size"]}
+
 
 class DatabaseManager:
+    # The snapshot is rewritten once the log grows past this fraction of it.
+    COMPACT_RATIO = 0.5
+    # Number of most recent snapshot backups kept in the backup folder.
+    BACKUP_KEEP = 5
+
     def __init__(self, database_file, database_backup_folder):
         self.database_file = database_file
+        # Changes since the last snapshot are appended here as JSON lines, so a
+        # save costs O(changes) instead of rewriting the whole database.
+        self.database_log_file = os.path.splitext(database_file)[0] + ".log"
         self.database_backup_folder = database_backup_folder
+        self._pending_ops = []  # mutation records not yet written to the log
+        self._log_damaged = False
+        # Lookup structures for the db most recently queried; they are rebuilt
+        # whenever a different db object is passed in.
+        self._indexed_db = None
+        self._path_index = {}  # file_path -> account_id
+        self._account_order = {}  # account_id -> position, breaks used_space ties
+        self._account_heap = []  # (-used_space, position, account_id), lazily pruned
 
     def load_database(self):
-        """Loads the database from the JSON file."""
+        """Loads the database snapshot and replays the change log on top of it."""
+        try:
+            with open(self.database_file, "rb") as f:
+                db = decode_json(f.read())
+        except FileNotFoundError:
+            db = {"accounts": {}}  # Start from an empty database if file not found
+
+        self._log_damaged = False
+        try:
+            with open(self.database_log_file, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        op = decode_json(line)
+                    except ValueError:
+                        # Left behind by an interrupted save; compacting on the
+                        # next save drops it instead of appending after it.
+                        print(
+                            f"Warning: Ignoring unreadable database log entry: {line!r}"
+                        )
+                        self._log_damaged = True
+                        continue
+                    _apply_op(db, op)
+        except FileNotFoundError:
+            pass
+        self._pending_ops = []
+        return db
+
+    def save_database(self, db, checkpoint=False):
+        """Saves the database.
+
+        Normally only the changes made through this manager since the last load
+        or save are appended to the log. The full snapshot is rewritten, after
+        taking a timestamped backup, when checkpoint is set or the log is due
+        for compaction.
+        """
+        if checkpoint or self._log_needs_compaction():
+            self.create_database_backup()
+            self._write_snapshot(db)
+        elif self._pending_ops:
+            payload = b"".join(
+                encode_json(op, pretty=False) + b"\n" for op in self._pending_ops
+            )
+            with open(self.database_log_file, "ab") as f:
+                f.write(payload)
+        self._pending_ops = []
+
+    def _log_needs_compaction(self):
+        """Checks whether the next save should rewrite the snapshot."""
+        if self._log_damaged:
+            return True
+        try:
+            snapshot_size = os.path.getsize(self.database_file)
+        except FileNotFoundError:
+            return True
         try:
-            with open(self.database_file, "r") as f:
-                return json.load(f)
+            log_size = os.path.getsize(self.database_log_file)
         except FileNotFoundError:
-            return {"accounts": {}}  # Return empty database if file not found
+            return False
+        return log_size > snapshot_size * self.COMPACT_RATIO
 
-    def save_database(self, db):
-        """Saves the database to the JSON file."""
-        if not os.path.exists(self.database_file):
-            with open(self.database_file, "w") as f:
-                json.dump(
-                    {"accounts": {}}, f
-                )  # create an empty database file if it doesn't exist
+    def _write_snapshot(self, db):
+        """Writes db as the new snapshot and drops the log it now includes."""
+        # The database is machine-read; pretty copies live in the run backups.
+        data = encode_json(db, pretty=False)
+        # Write to a temp file and swap it in, so a crash mid-write can't leave
+        # a truncated snapshot behind.
+        tmp_file = self.database_file + ".tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.database_file)
+        try:
+            os.remove(self.database_log_file)
+        except FileNotFoundError:
+            pass
+        self._log_damaged = False
 
-        self.create_database_backup()
-        with open(self.database_file, "w") as f:
-            json.dump(db, f, indent=4)
+    def _record(self, db, op):
+        """Applies a mutation to db and queues it for the next save."""
+        _apply_op(db, op)
+        self._pending_ops.append(op)
 
     def initialize_database(self, db, accounts_folder):
         """Initializes the database with service account information."""
-        sa_files = [f for f in os.listdir(accounts_folder) if f.endswith(".json")]
-        for sa_file in sa_files:
-            account_id = sa_file.replace(".json", "")
+        for account_id in get_service_account_ids(accounts_folder):
             if account_id not in db["accounts"]:
-                db["accounts"][account_id] = {
-                    "used_space": 0,
-                    "remaining_space": int(
-                        14.95 * 1024**3
-                    ),  # Not doing 15 fully for now
-                    "files": {},
-                }
+                if db is self._indexed_db:
+                    self._indexed_db = None
+                self._record(
+                    db,
+                    {
+                        "op": "account",
+                        "account_id": account_id,
+                        "remaining_space": INITIAL_QUOTA,
+                    },
+                )
         return db
 
     def update_account_usage(self, db, account_id, file_size, file_path):
-        """Updates the account usage in the database."""
+        """Updates the account usage in the database, in place."""
         if account_id not in db["accounts"]:
             print(f"Error: Account {account_id} not found in database.")
-            return db  # Return db as it was if account_id is invalid
+            return
 
-        db["accounts"][account_id]["used_space"] += file_size
-        db["accounts"][account_id]["remaining_space"] -= file_size
-        db["accounts"][account_id]["files"][file_path] = {"size": file_size}
-        return db
+        self._record(
+            db,
+            {
+                "op": "add",
+                "account_id": account_id,
+                "path": file_path,
+                "size": file_size,
+            },
+        )
+        if self._indexed_db is db:
+            self._path_index[file_path] = account_id
+            self._push_account(db, account_id)
+
+    def remove_file(self, db, account_id, file_path):
+        """Removes a file from an account and frees the space it used, in place."""
+        self._record(db, {"op": "remove", "account_id": account_id, "path": file_path})
+        if self._indexed_db is db:
+            self._path_index.pop(file_path, None)
+            self._push_account(db, account_id)
 
     def find_suitable_account(self, db, file_size):
         """Finds a suitable service account for a file."""
-        suitable_accounts = []
-        for account_id, data in db["accounts"].items():
-            if data["remaining_space"] >= file_size:
-                suitable_accounts.append((account_id, data["used_space"]))
-
-        if not suitable_accounts:
-            return None
-
-        suitable_accounts.sort(
-            key=lambda x: x[1], reverse=True
-        )  # Sort by most used to optimize space
-        return suitable_accounts[0][0]
+        # Prefer the most used account that still fits, to optimize space.
+        self._build_indexes(db)
+        heap = self._account_heap
+        accounts = db["accounts"]
+        skipped = []
+        account_id = None
+        while heap:
+            neg_used_space, _, candidate = heap[0]
+            data = accounts[candidate]
+            if -neg_used_space != data["used_space"]:
+                heapq.heappop(heap)  # stale, a newer entry was pushed on update
+            elif data["remaining_space"] >= file_size:
+                account_id = candidate
+                break
+            else:
+                skipped.append(heapq.heappop(heap))
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return account_id
 
     def file_already_processed(self, db, file_path):
         """Checks if a file has already been processed based on its name."""
-        for account_id, data in db["accounts"].items():
-            if file_path in data["files"]:
-                print(f"Skipping (already uploaded): {file_path}")
-                return True
-        return False
+        self._build_indexes(db)
+        return file_path in self._path_index
+
+    def _build_indexes(self, db):
+        """Builds the lookup structures for db unless they are already current."""
+        if self._indexed_db is db:
+            return
+        accounts = db["accounts"]
+        self._path_index = {
+            file_path: account_id
+            for account_id, data in accounts.items()
+            for file_path in data["files"]
+        }
+        self._account_order = {
+            account_id: position for position, account_id in enumerate(accounts)
+        }
+        self._account_heap = [
+            (-data["used_space"], self._account_order[account_id], account_id)
+            for account_id, data in accounts.items()
+        ]
+        heapq.heapify(self._account_heap)
+        self._indexed_db = db
+
+    def _push_account(self, db, account_id):
+        """Records an account's new used_space in the account heap."""
+        heapq.heappush(
+            self._account_heap,
+            (
+                -db["accounts"][account_id]["used_space"],
+                self._account_order[account_id],
+                account_id,
+            ),
+        )
 
     def create_database_backup(self):
-        """Creates a backup of the database file."""
-        if not os.path.exists(self.database_backup_folder):
-            os.makedirs(self.database_backup_folder)
+        """Creates a backup of the database snapshot and its change log."""
+        os.makedirs(self.database_backup_folder, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_file = os.path.join(
             self.database_backup_folder, f"drive_data_backup_{timestamp}.json"
         )
         try:
-            shutil.copy2(self.database_file, backup_file)
+            _link_or_copy(self.database_file, backup_file)
             print(f"Database backup created: {backup_file}")
         except FileNotFoundError:
             print("Warning: Database file not found. No backup created.")
         except Exception as e:
             print(f"Error creating database backup: {e}")
+
+        if os.path.exists(self.database_log_file):
+            log_backup_file = backup_file[: -len(".json")] + ".log"
+            try:
+                _link_or_copy(self.database_log_file, log_backup_file)
+                print(f"Database log backup created: {log_backup_file}")
+            except Exception as e:
+                print(f"Error creating database log backup: {e}")
+
+        self._prune_database_backups()
+
+    def _prune_database_backups(self):
+        """Deletes all but the BACKUP_KEEP most recent database backups."""
+        prefix = "drive_data_backup_"
+        backups = {}  # timestamp -> files backed up at that time
+        with os.scandir(self.database_backup_folder) as entries:
+            for entry in entries:
+                if entry.name.startswith(prefix):
+                    timestamp = os.path.splitext(entry.name)[0][len(prefix) :]
+                    backups.setdefault(timestamp, []).append(entry.path)
+        for timestamp in sorted(backups)[: -self.BACKUP_KEEP]:
+            for path in backups[timestamp]:
+                os.remove(path)
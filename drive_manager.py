@@ -1,19 +1,28 @@
 import os
 import subprocess
+import tempfile
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
+from database_manager import decode_json
+from file_manager import FileInfo
+
 
 class DriveManager:
     def __init__(self, master_remote):
         self.master_remote = master_remote
         self.SCOPES = ["https://www.googleapis.com/auth/drive.metadata.readonly"]
+        self._service = None
+        self._folder_name_cache = {}
+
+    def _ensure_service(self):
+        """Builds the Drive API service once and reuses it for later calls."""
+        if self._service is not None:
+            return self._service
 
-    def get_folder_name(self, folder_id):
-        """Fetches the name of a Google Drive folder."""
         creds = None
         if os.path.exists("token.json"):
             creds = Credentials.from_authorized_user_file("token.json", self.SCOPES)
@@ -28,73 +37,92 @@ class DriveManager:
             with open("token.json", "w") as token:
                 token.write(creds.to_json())
 
+        self._service = build("drive", "v3", credentials=creds)
+        return self._service
+
+    def get_folder_name(self, folder_id):
+        """Fetches the name of a Google Drive folder."""
+        if folder_id in self._folder_name_cache:
+            return self._folder_name_cache[folder_id]
+
         try:
-            service = build("drive", "v3", credentials=creds)
+            service = self._ensure_service()
             results = service.files().get(fileId=folder_id, fields="name").execute()
             folder_name = results.get("name", None)
-            return folder_name
         except HttpError as error:
             # TODO Handle errors from drive API.
             print(f"An error occurred: {error}")
             return None
 
+        self._folder_name_cache[folder_id] = folder_name
+        return folder_name
+
     def scan_drive_directory(self, drive_id, destination_base_path, upload_folder):
         """Scans a directory in Google Drive and returns file information."""
 
-        ls_output = self.run_rclone_ls(drive_id)
-        if ls_output is None:
-            return None
-
-        files_info = []
-        drive_folder_name = None
         if upload_folder:
             drive_folder_name = self.get_folder_name(drive_id)
             if drive_folder_name is None:
                 return None
+            destination_path = os.path.join(destination_base_path, drive_folder_name)
+        else:
+            destination_path = destination_base_path
+        # join with "" adds a separator only where os.path.join would.
+        destination_prefix = os.path.join(destination_path, "")
 
-        for item in ls_output:
-            file_path = item["filename"]
-            file_size = int(item["size"])
-            if upload_folder:
-                destination_path = os.path.join(
-                    destination_base_path, drive_folder_name
+        files_info = []
+        try:
+            for file_path, file_size in self.run_rclone_ls(drive_id):
+                files_info.append(
+                    FileInfo(
+                        filename=file_path,
+                        size=file_size,
+                        relative_file_path=file_path,
+                        destination_path=destination_path,
+                        destination_path_with_name=destination_prefix + file_path,
+                    )
                 )
-            else:
-                destination_path = destination_base_path
-            destination_path_with_name = os.path.join(destination_path, file_path)
-
-            files_info.append(
-                {
-                    "filename": file_path,
-                    "size": file_size,
-                    "relative_file_path": file_path,  # for include files
-                    "destination_path": destination_path,  # for destination foldername; only need it once sooooo will optimize it in future
-                    "destination_path_with_name": destination_path_with_name,
-                }
-            )
+        except subprocess.CalledProcessError as error:
+            print(f"Error running rclone lsjson: \n{error.stderr}")
+            return None
         return files_info
 
     def run_rclone_ls(self, drive_id):
-        """Runs rclone ls command and returns the JSON output."""
+        """Runs rclone lsjson and yields (path, size) for each file as it is listed.
+
+        Raises subprocess.CalledProcessError, with rclone's stderr attached, once
+        the listing is exhausted if rclone failed.
+        """
         command = [
             "rclone",
-            "ls",
+            "lsjson",
+            "--recursive",
+            "--files-only",
+            "--no-modtime",
+            "--no-mimetype",
             "--fast-list",
             "--max-depth=15",  # temp fix for recursive shortcut problem
             f"{self.master_remote},root_folder_id={drive_id}:",
         ]
-        result = subprocess.run(command, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"Error running rclone ls: \n{result.stderr}")
-            return None
-
-        files = []
-        for line in result.stdout.split("\n"):
-            if line:
-                temp = line.split()
-                if len(temp) >= 2:  # Check if the line has at least size and filename
-                    size, filename = temp[0], " ".join(temp[1:]).strip()
-                    files.append({"filename": filename, "size": size})
-                else:
-                    print(f"Warning: Skipping malformed rclone ls output line: {line}")
-        return files
+        # stderr goes to a temp file so a chatty rclone can't block on a full pipe
+        # while we are still reading stdout.
+        with tempfile.TemporaryFile(mode="w+") as stderr:
+            with subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                bufsize=1 << 20,
+            ) as proc:
+                # lsjson prints one object per line between "[" and "]", so each
+                # entry can be decoded as soon as it arrives.
+                for line in proc.stdout:
+                    line = line.strip().rstrip(",")
+                    if line and line not in ("[", "]"):
+                        item = decode_json(line)
+                        yield item["Path"], item["Size"]
+            if proc.returncode != 0:
+                stderr.seek(0)
+                raise subprocess.CalledProcessError(
+                    proc.returncode, command, stderr=stderr.read()
+                )
@@ -1,72 +1,136 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+
+@dataclass
+class FileInfo:
+    """A file to transfer and where it should end up on the remote."""
+
+    __slots__ = (
+        "filename",
+        "size",
+        "relative_file_path",
+        "destination_path",
+        "destination_path_with_name",
+    )
+    filename: str
+    size: int
+    relative_file_path: str  # for include files
+    destination_path: str  # rclone destination folder
+    destination_path_with_name: str  # database key
 
 
 class FileManager:
+    def __init__(self, max_workers=None):
+        # Threads used to walk a directory tree; None picks a default from the
+        # CPU count.
+        self.max_workers = max_workers
+
     def scan_local_directory(self, source_dir, destination_base_path, upload_folder):
         """Scans a local directory and returns file information."""
+        # Every file shares the same rclone destination, so build it once.
+        destination_path = os.path.join(
+            destination_base_path, os.path.basename(source_dir)
+        )
+        destination_root = destination_path if upload_folder else destination_base_path
 
+        files_info, subdirs = self._scan_directory(
+            source_dir, ".", destination_root, destination_path
+        )
+        if subdirs:
+            # The GIL is released around readdir/stat, so walking the top-level
+            # subtrees in threads overlaps their I/O. Results are merged in
+            # submission order, which keeps the output order deterministic.
+            max_workers = self.max_workers or min(32, (os.cpu_count() or 1) * 4)
+            max_workers = min(max_workers, len(subdirs))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(
+                        self._walk_subtree,
+                        root,
+                        relative_root,
+                        destination_root,
+                        destination_path,
+                    )
+                    for root, relative_root in subdirs
+                ]
+                for future in futures:
+                    files_info.extend(future.result())
+        return files_info
+
+    def _walk_subtree(self, root, relative_root, destination_root, destination_path):
+        """Walks a directory tree depth-first and returns its file information."""
         files_info = []
+        stack = [(root, relative_root)]
+        while stack:
+            directory, directory_relative_root = stack.pop()
+            directory_files, subdirs = self._scan_directory(
+                directory, directory_relative_root, destination_root, destination_path
+            )
+            files_info.extend(directory_files)
+            # Reversed so directories are visited in listing order, like os.walk.
+            stack.extend(reversed(subdirs))
+        return files_info
 
-        for root, dirs, files in os.walk(source_dir):
-            relative_root = os.path.relpath(root, source_dir)
+    def _scan_directory(self, root, relative_root, destination_root, destination_path):
+        """Scans a single directory.
 
-            if upload_folder:
-                current_destination_path = (
-                    os.path.join(
-                        destination_base_path,
-                        os.path.basename(source_dir),
-                        relative_root,
-                    )
-                    if relative_root != "."
-                    else os.path.join(
-                        destination_base_path, os.path.basename(source_dir)
-                    )
-                )
-            else:
-                current_destination_path = (
-                    os.path.join(destination_base_path, relative_root)
-                    if relative_root != "."
-                    else destination_base_path
-                )
+        Returns the FileInfo records for its files and (path, relative_root)
+        pairs for its subdirectories. relative_root is root relative to the
+        scanned source directory, carried along so per-file relative paths are
+        a plain concatenation.
+        """
+        try:
+            entries = os.scandir(root)
+        except OSError as error:
+            print(f"Warning: Skipping unreadable directory {root}: {error}")
+            return [], []
 
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_size = os.path.getsize(file_path)
+        if relative_root == ".":
+            rel_prefix = ""
+            # join with "" adds a separator only where os.path.join would.
+            dst_prefix = os.path.join(destination_root, "")
+        else:
+            rel_prefix = relative_root + os.sep
+            dst_prefix = os.path.join(destination_root, relative_root, "")
 
-                destination_path = current_destination_path
-                destination_path_with_name = os.path.join(
-                    current_destination_path, file
-                )
-                relative_file_path = os.path.relpath(file_path, source_dir)
+        files_info = []
+        subdirs = []
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append((entry.path, rel_prefix + entry.name))
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue  # rclone skips symlinks without -L/-l as well
 
+                file = entry.name
                 files_info.append(
-                    {
-                        "filename": file,
-                        "relative_file_path": relative_file_path,
-                        "size": file_size,
-                        "destination_path": os.path.join(
-                            destination_base_path, os.path.basename(source_dir)
-                        ),
-                        "destination_path_with_name": destination_path_with_name,
-                        # "full_file_path": file_path,
-                    }
+                    FileInfo(
+                        filename=file,
+                        size=entry.stat(follow_symlinks=False).st_size,
+                        relative_file_path=rel_prefix + file,
+                        destination_path=destination_path,
+                        destination_path_with_name=dst_prefix + file,
+                    )
                 )
-        return files_info
+        return files_info, subdirs
 
-    def get_file_info(self, source, destination):
+    def get_file_info(self, source, destination, file_size=None):
         """Gets info for a single file"""
-        file_size = os.path.getsize(source)
+        if file_size is None:
+            file_size = os.path.getsize(source)
         destination_with_filename = (
             f"{destination}/{os.path.basename(source)}"
             if destination
             else os.path.basename(source)
         )
         destination_path = destination
-        return {
-            "filename": os.path.basename(source),
-            "relative_file_path": os.path.basename(source),
-            "size": file_size,
-            "destination_path": destination_path,
-            "destination_path_with_name": destination_with_filename,
-            # "full_file_path": source,
-        }
+        return FileInfo(
+            filename=os.path.basename(source),
+            size=file_size,
+            relative_file_path=os.path.basename(source),
+            destination_path=destination_path,
+            destination_path_with_name=destination_with_filename,
+        )
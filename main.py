@@ -1,9 +1,11 @@
 import argparse
 import os
-import copy
+import shlex
+import sys
+from collections import defaultdict
 
 from drive_manager import DriveManager
-from database_manager import DatabaseManager
+from database_manager import DatabaseManager, clone_json
 from rclone_manager import RcloneManager
 from transfer_manager import TransferManager
 from backup_manager import BackupManager
@@ -19,8 +21,16 @@ BACKUPS_DIR = "backups"
 def print_drive_structure(db, path, drive_manager):
     """Prints the Google Drive structure."""
 
+    def _new_level():
+        return defaultdict(_new_level)
+
     def _build_tree(account_files, filter_path=None):
-        tree = {}
+        # Missing levels are created on first access, without allocating a
+        # throwaway dict per path part like setdefault(part, {}) does.
+        tree = _new_level()
+        sep = os.sep
+        # Folder names repeat across many paths; interning keeps one copy each.
+        intern = sys.intern
         for account_id, files in account_files.items():
             for file_path, file_data in files.items():
                 if filter_path is None or file_path.startswith(filter_path):
@@ -29,25 +39,28 @@ def print_drive_structure(db, path, drive_manager):
                         if filter_path
                         else file_path
                     )
-                    parts = relative_file_path.split(os.sep)
                     current_level = tree
-                    for part in parts:
-                        if part not in current_level:
-                            current_level[part] = {}
-                        current_level = current_level[part]
+                    for part in relative_file_path.split(sep):
+                        current_level = current_level[intern(part)]
                     current_level["(file)"] = {
                         "size": file_data["size"],
                         "full_path": file_path,
                     }
         return tree
 
-    def _print_tree(tree, indent=""):
-        for key, value in tree.items():
-            if key == "(file)":
-                pass
+    def _print_tree(tree):
+        # Depth-first with an explicit stack of iterators, so deep trees can't
+        # hit the recursion limit.
+        stack = [(iter(tree.items()), "")]
+        while stack:
+            items, indent = stack[-1]
+            for key, value in items:
+                if key != "(file)":
+                    print(f"{indent}- {key}")
+                    stack.append((iter(value.items()), indent + " "))
+                    break
             else:
-                print(f"{indent}- {key}")
-                _print_tree(value, indent + " ")
+                stack.pop()
 
     account_files = {
         account_id: data["files"] for account_id, data in db["accounts"].items()
@@ -70,7 +83,25 @@ def print_drive_structure(db, path, drive_manager):
 def print_commands(rclone_commands):
     print("\nRclone Commands:\n\n")
     for command in rclone_commands:
-        print(command)
+        print(shlex.join(command))
+
+
+def write_commands_script(rclone_commands, script_path, parallelism):
+    """Writes a shell script that runs the rclone commands in parallel."""
+    # Commands are passed NUL-separated so xargs leaves their quoting alone.
+    lines = [
+        "#!/usr/bin/env bash",
+        f"# Runs the generated rclone commands, {parallelism} at a time.",
+        "printf '%s\\0' \\",
+    ]
+    lines.extend(
+        f"    {shlex.quote(shlex.join(command))} \\" for command in rclone_commands
+    )
+    lines.append(f"    | xargs -0 -n 1 -P {parallelism} bash -c")
+    with open(script_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.chmod(script_path, 0o755)
+    print(f"Commands script written to: {script_path}")
 
 
 def main():
@@ -111,6 +142,31 @@ def main():
         metavar="SOURCE",
         help="Remove the specified file or folder from the remote",
     )
+    parser.add_argument(
+        "--emit-script",
+        metavar="PATH",
+        help="Also write the generated commands to a shell script that runs them in parallel",
+    )
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=4,
+        metavar="N",
+        help="Number of commands the emitted script runs at once (default: 4)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of threads used to scan a local source directory",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Don't print a line for every skipped or removed file",
+    )
     parser.add_argument(
         "-h",
         "--help",
@@ -124,12 +180,14 @@ def main():
     drive_manager = DriveManager(MASTER_REMOTE)
     database_manager = DatabaseManager(DATABASE_FILE, DATABASE_BACKUP_FOLDER)
     rclone_manager = RcloneManager(RCLONE_INCLUDE_FILES_DIR)
-    transfer_manager = TransferManager(drive_manager, database_manager, rclone_manager)
+    transfer_manager = TransferManager(
+        drive_manager, database_manager, rclone_manager, args.workers, args.quiet
+    )
     backup_manager = BackupManager(BACKUPS_DIR, RCLONE_INCLUDE_FILES_DIR)
 
     db_before = database_manager.load_database()
     db_before = database_manager.initialize_database(db_before, ACCOUNTS_FOLDER)
-    db = copy.deepcopy(db_before)
+    db = clone_json(db_before)
     rclone_commands = []
 
     if args.structure is not None:
@@ -145,12 +203,12 @@ def main():
     else:
         parser.error("Please provide valid arguments. Use -h for help.")
 
-    db_after = database_manager.load_database()
-
     if rclone_commands:
-        backup_manager.create_backup(args, rclone_commands, db_before, db_after)
+        backup_manager.create_backup(args, rclone_commands, db_before, db)
 
         print_commands(rclone_commands)
+        if args.emit_script:
+            write_commands_script(rclone_commands, args.emit_script, args.parallelism)
     else:
         print("NO CHANGES!!!")
 
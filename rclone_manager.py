@@ -1,15 +1,34 @@
 import os
-import re
 
 
 class RcloneManager:
+    # Characters rclone's filter globs treat specially, plus the comment markers
+    # and whitespace that rclone would strip or misread at the ends of a line.
+    # A backslash makes rclone match the next character literally.
+    _ESCAPE_TABLE = str.maketrans({c: "\\" + c for c in "\\*?[]{}#; \t"})
+
+    # Fixed leading arguments of the generated commands.
+    _COPY_PREFIX = (
+        "rclone",
+        "copy",
+        "--ignore-existing",
+        "--no-check-dest",
+        "--size-only",
+        "--progress",
+        "--drive-copy-shortcut-content",
+    )
+    _DELETE_PREFIX = ("rclone", "delete")
+
     def __init__(self, rclone_include_files_dir):
         self.rclone_include_files_dir = rclone_include_files_dir
 
     def generate_rclone_command(
         self, account_id, include_file, destination_path, source_path, is_delete=False
     ):
-        """Generates an rclone copy/delete command using an include file."""
+        """Generates an rclone copy/delete command using an include file.
+
+        The command is returned as an argument list; use shlex.join to display it.
+        """
         # config_file = os.path.join("accounts", f"{account_id}.json")
         remote_name = f"g{account_id}"
 
@@ -33,37 +52,32 @@ class RcloneManager:
 
         if is_delete:
             command = [
-                "rclone",
-                "delete",
+                *self._DELETE_PREFIX,
                 "--include-from",
                 include_file,
-                f'"{remote_name}:{destination_path}"',
+                f"{remote_name}:{destination_path}",
             ]
         else:
             command = [
-                "rclone",
-                "copy",
-                "--ignore-existing",
-                "--no-check-dest",
-                "--size-only",
-                "--progress",
-                "--drive-copy-shortcut-content",
+                *self._COPY_PREFIX,
                 "--include-from",
                 include_file,
-                f'"{source_path}"',  # Source is current directory, as include file contains paths
-                f'"{remote_name}:{destination_path}"',
+                source_path,  # include file paths are relative to this
+                f"{remote_name}:{destination_path}",
             ]
-        command_str = " ".join(command)
 
-        # return create_remote_command_str, command_str
-        return command_str
+        # return create_remote_command_str, command
+        return command
 
     def create_rclone_include_file(self, account_id, file_paths):
         """Creates an include file for rclone with the given file paths."""
         os.makedirs(self.rclone_include_files_dir, exist_ok=True)
         include_file_name = f"include_{account_id}.txt"
         include_file = os.path.join(self.rclone_include_files_dir, include_file_name)
+        escape_table = self._ESCAPE_TABLE
+        payload = "".join(
+            file_path.translate(escape_table) + "\n" for file_path in file_paths
+        )
         with open(include_file, "w") as f:
-            for file_path in file_paths:
-                f.write(f"{re.escape(file_path)}\n")
+            f.write(payload)
         return include_file
@@ -1,19 +1,38 @@
 import os
-import copy
+import shlex
+import stat
+from collections import defaultdict
 from file_manager import FileManager
 
 
 class TransferManager:
-    def __init__(self, drive_manager, database_manager, rclone_manager):
+    def __init__(
+        self,
+        drive_manager,
+        database_manager,
+        rclone_manager,
+        scan_workers=None,
+        quiet=False,
+    ):
         self.drive_manager = drive_manager
         self.database_manager = database_manager
         self.rclone_manager = rclone_manager
+        self.scan_workers = scan_workers
+        self.quiet = quiet  # suppresses the per-file progress lines
 
     def process_transfer(self, source, destination, upload_folder, db):
         """Processes the file/directory transfer."""
         rclone_commands = []
         files_to_transfer = []
 
+        # One stat answers both the dir/file question and the file size.
+        source_stat = None
+        if not source.startswith("id="):
+            try:
+                source_stat = os.stat(source)
+            except (OSError, ValueError):
+                pass  # reported as an invalid source below
+
         if source.startswith("id="):
             drive_id = source[3:]
             files_info = self.drive_manager.scan_drive_directory(
@@ -22,57 +41,61 @@ class TransferManager:
             if files_info is None:
                 return db, rclone_commands
             files_to_transfer = files_info
-        elif os.path.isdir(source):
-            file_manager = FileManager()
+        elif source_stat is not None and stat.S_ISDIR(source_stat.st_mode):
+            file_manager = FileManager(self.scan_workers)
             files_info = file_manager.scan_local_directory(
                 source, destination, upload_folder
             )
             files_to_transfer = files_info
-        elif os.path.isfile(source):
+        elif source_stat is not None and stat.S_ISREG(source_stat.st_mode):
             file_manager = FileManager()
-            files_info = file_manager.get_file_info(source, destination)
+            files_info = file_manager.get_file_info(
+                source, destination, source_stat.st_size
+            )
             files_to_transfer = [files_info]
         else:
             print(f"Error: Invalid source path: {source}")
             return db, rclone_commands
 
-        account_files = {}
+        account_files = defaultdict(
+            lambda: {
+                "file_paths": [],
+                "destination_paths": [],
+                # "source_paths": [],
+            }
+        )
         for file_info in files_to_transfer:
-            if not self.database_manager.file_already_processed(
-                db, file_info["destination_path_with_name"]
+            if self.database_manager.file_already_processed(
+                db, file_info.destination_path_with_name
             ):
+                if not self.quiet:
+                    print(
+                        f"Skipping (already uploaded): {file_info.destination_path_with_name}"
+                    )
+            else:
                 account_id = self.database_manager.find_suitable_account(
-                    db, file_info["size"]
+                    db, file_info.size
                 )
                 if account_id:
-                    if account_id not in account_files:
-                        account_files[account_id] = {
-                            "file_paths": [],
-                            "destination_paths": [],
-                            # "source_paths": [],
-                        }
-                    account_files[account_id]["file_paths"].append(
-                        file_info["relative_file_path"]
-                    )
-                    account_files[account_id]["destination_paths"].append(
-                        file_info["destination_path"]
-                    )
-                    # account_files[account_id]["source_paths"].append(
-                    #     file_info["full_file_path"]
+                    group = account_files[account_id]
+                    group["file_paths"].append(file_info.relative_file_path)
+                    group["destination_paths"].append(file_info.destination_path)
+                    # group["source_paths"].append(
+                    #     file_info.full_file_path
                     # )
 
-                    db = self.database_manager.update_account_usage(
+                    self.database_manager.update_account_usage(
                         db,
                         account_id,
-                        file_info["size"],
-                        file_info["destination_path_with_name"],
+                        file_info.size,
+                        file_info.destination_path_with_name,
                     )
                     # print(
-                    #     f"Preparing to upload (using {account_id}): {file_info['full_file_path']} -> {file_info['destination_path_with_name']}"
+                    #     f"Preparing to upload (using {account_id}): {file_info.relative_file_path} -> {file_info.destination_path_with_name}"
                     # )
                 else:
                     print(
-                        f"Error: No suitable account found for {file_info['full_file_path']} (size: {file_info['size']} bytes)"
+                        f"Error: No suitable account found for {file_info.relative_file_path} (size: {file_info.size} bytes)"
                     )
 
         for account_id, data in account_files.items():
@@ -102,7 +125,7 @@ class TransferManager:
         """Handles the removal of files/folders."""
         rclone_commands = []
         removal_map = self.find_account_and_path(db, source)
-        db = self.remove_from_database(copy.deepcopy(db), removal_map)
+        self.remove_from_database(db, removal_map)
 
         if not removal_map:
             print("Error: Nothing to remove.\nCheck if path is correct.")
@@ -119,7 +142,7 @@ class TransferManager:
             rclone_commands.append(delete_command)
 
         print("\nGenerated rclone delete command:")
-        print("\n".join(rclone_commands))
+        print("\n".join(shlex.join(command) for command in rclone_commands))
         return db, rclone_commands
 
     def find_account_and_path(self, db, path):
@@ -137,9 +160,7 @@ class TransferManager:
     def remove_from_database(self, db, removal_map):
         """Removes entries from the database corresponding to the deleted path."""
         for account_id, data in removal_map.items():
-            for file_path, file_size in data.items():
-                db["accounts"][account_id]["used_space"] -= file_size
-                db["accounts"][account_id]["remaining_space"] += file_size
-                del db["accounts"][account_id]["files"][file_path]
-                print(f"Removed from database: {file_path}")
-        return db
+            for file_path in data:
+                self.database_manager.remove_file(db, account_id, file_path)
+                if not self.quiet:
+                    print(f"Removed from database: {file_path}")